@@ -4,15 +4,27 @@ QEMU OP-TEE Monitor Script
 Monitors QEMU VM status and SuperRelay health inside the OP-TEE environment
 """
 
+import os
 import time
 import socket
 import subprocess
 import json
+import http.client
 import logging
+import selectors
 import signal
 import sys
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import orjson  # Optional: faster JSON encode/decode
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -26,6 +38,61 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def json_loads(data: bytes) -> Any:
+    """Decode JSON, preferring orjson when installed.
+    
+    Unlike the stdlib, orjson decodes integers wider than 64 bits as floats,
+    so such values (e.g. large wei amounts) lose precision on that path.
+    """
+    if orjson is not None:
+        return orjson.loads(data)  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    return json.loads(data)
+
+def json_dumps(obj: Any) -> bytes:
+    """Encode JSON as indented UTF-8 bytes, preferring orjson when installed.
+    
+    Both paths write non-ASCII text as raw UTF-8. Float formatting still
+    differs (orjson writes 1e16 where the stdlib writes 1e+16).
+    """
+    if orjson is not None:
+        # Pass datetimes through to default=str so output matches the stdlib path
+        return orjson.dumps(
+            obj, default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+    return json.dumps(obj, indent=2, default=str, ensure_ascii=False).encode('utf-8')
+
+# Console output markers. The quoted forms are what gets sent, so the console's
+# echo of the command line (even if wrapped or redrawn) never contains a marker
+CONSOLE_END_MARKER = '__MONITOR_EOC__'
+CONSOLE_END_MARKER_QUOTED = "'__MONITOR_'EOC__"
+CONSOLE_SPLIT_MARKER = '---SPLIT---'
+CONSOLE_SPLIT_MARKER_QUOTED = "'---SP'LIT---"
+
+def ttl_cache(seconds: float):
+    """Memoize a monitor check for `seconds`, keyed by method name.
+    
+    Results live in the instance's `_cache` so the fast loop and the detailed
+    report share a single probe instead of forking/connecting twice.
+    """
+    def decorator(method):
+        key = method.__name__
+        
+        @functools.wraps(method)
+        def wrapper(self):
+            now = time.monotonic()
+            with self._cache_lock:
+                cached = self._cache.get(key)
+            if cached is not None and now - cached[0] < seconds:
+                return cached[1]
+            
+            result = method(self)
+            with self._cache_lock:
+                self._cache[key] = (time.monotonic(), result)
+            return result
+        return wrapper
+    return decorator
+
 class QemuOpteeMonitor:
     """Monitor for QEMU VM running OP-TEE and SuperRelay"""
     
@@ -33,6 +100,29 @@ class QemuOpteeMonitor:
         self.qemu_console_port = 54320
         self.qemu_monitor_port = 54321
         self.superrelay_health_url = "http://localhost:3000/health"
+        
+        # Probe the health endpoint in-process over a reused keep-alive connection
+        health_url = urlsplit(self.superrelay_health_url)
+        self._health_host = health_url.hostname
+        self._health_port = health_url.port or 80
+        self._health_path = health_url.path or '/'
+        self._health_conn: Optional[http.client.HTTPConnection] = None
+        self._health_lock = threading.Lock()
+        
+        # Pooled QEMU console connection, reused across the commands of one tick.
+        # The selector (epoll on Linux, kqueue/select elsewhere) wakes readers as
+        # soon as the console has output instead of polling.
+        self._console_sock: Optional[socket.socket] = None
+        self._console_lock = threading.Lock()
+        self._console_selector = selectors.DefaultSelector()
+        
+        # Self-pipe that lets stop() wake the idle wait immediately, since the
+        # adaptive check interval can keep the loop waiting for minutes
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self._wakeup_selector = selectors.DefaultSelector()
+        self._wakeup_selector.register(self._wakeup_recv, selectors.EVENT_READ)
         self.running = True
         self.stats = {
             'start_time': datetime.now(),
@@ -41,18 +131,77 @@ class QemuOpteeMonitor:
             'last_health_check': None,
             'tee_operations': 0
         }
+        self._stats_lock = threading.Lock()
+        self._healthy_streak = 0
+        
+        # Detailed report skeleton, updated in place on every report
+        self._report: Dict[str, Any] = {
+            'timestamp': None,
+            'uptime': None,
+            'qemu': {'process_running': False, 'console_accessible': False},
+            'optee': None,
+            'trusted_application': None,
+            'superrelay': None,
+            'system_stats': None,
+            'monitor_stats': None
+        }
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self._cache_lock = threading.Lock()
+        
+        # Checks are I/O-bound (subprocess, socket, HTTP), so run them in parallel
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='monitor-check')
         
         # Setup signal handlers
         signal.signal(signal.SIGTERM, self._signal_handler)
         signal.signal(signal.SIGINT, self._signal_handler)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self._reload_handler)
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
         logger.info(f"Received signal {signum}, shutting down monitor...")
+        self.stop()
+    
+    def stop(self):
+        """Stop the monitoring loop, waking it if it is waiting between checks"""
         self.running = False
+        try:
+            self._wakeup_send.send(b'\0')
+        except OSError:
+            pass  # Buffer full means a wakeup is already pending
+    
+    def _reload_handler(self, signum, frame):
+        """Drop cached check results so the next tick probes everything afresh"""
+        logger.info(f"Received signal {signum}, invalidating cached check results")
+        self.invalidate_cache()
+    
+    def invalidate_cache(self):
+        """Clear all memoized check results"""
+        # Rebind rather than lock: this runs from a signal handler on the main
+        # thread, which could otherwise deadlock against a held _cache_lock
+        self._cache = {}
     
     def check_qemu_process(self) -> bool:
         """Check if QEMU process is running"""
+        try:
+            # Scan /proc directly rather than forking pgrep on every tick
+            with os.scandir('/proc') as entries:
+                for entry in entries:
+                    if not entry.name.isdigit():
+                        continue
+                    try:
+                        with open(f'/proc/{entry.name}/cmdline', 'rb') as f:
+                            if b'qemu-system-aarch64' in f.read():
+                                return True
+                    except OSError:
+                        continue  # Process exited or is not readable
+            return False
+        except FileNotFoundError:
+            pass  # No procfs (non-Linux), fall back to pgrep
+        except Exception as e:
+            logger.error(f"Error checking QEMU process: {e}")
+            return False
+        
         try:
             result = subprocess.run(
                 ["pgrep", "-f", "qemu-system-aarch64"],
@@ -66,6 +215,10 @@ class QemuOpteeMonitor:
     
     def check_console_connection(self) -> bool:
         """Check if we can connect to QEMU console"""
+        # The serial console accepts a single client, so an open pooled socket
+        # is itself proof of accessibility
+        if self._console_sock is not None:
+            return True
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
                 sock.settimeout(5)
@@ -75,52 +228,181 @@ class QemuOpteeMonitor:
             logger.debug(f"Console connection check failed: {e}")
             return False
     
+    def _get_console_socket(self, timeout: float) -> socket.socket:
+        """Return the persistent console socket, connecting lazily on first use"""
+        if self._console_sock is None:
+            self._console_sock = socket.create_connection(
+                ('localhost', self.qemu_console_port), timeout=timeout
+            )
+            self._console_selector.register(self._console_sock, selectors.EVENT_READ)
+        self._console_sock.settimeout(timeout)
+        return self._console_sock
+    
+    def _close_console_socket(self):
+        """Drop the console socket so the next command reconnects"""
+        if self._console_sock is not None:
+            try:
+                self._console_selector.unregister(self._console_sock)
+            except (KeyError, ValueError):
+                pass
+            try:
+                self._console_sock.close()
+            except OSError:
+                pass
+            self._console_sock = None
+    
+    def release_console_socket(self):
+        """Hand the console back between ticks.
+        
+        QEMU's serial console serves a single client, so holding it open would
+        leave operators' `telnet localhost 54320` sessions stuck in the backlog.
+        """
+        with self._console_lock:
+            self._close_console_socket()
+    
+    def _read_until_prompt(self, sock: socket.socket, timeout: float) -> str:
+        """Read console output until the end-of-command marker or the timeout"""
+        deadline = time.monotonic() + timeout
+        buffer = b''
+        while CONSOLE_END_MARKER.encode() not in buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._console_selector.select(remaining):
+                raise socket.timeout("Timed out waiting for console output")
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("Console connection closed")
+            buffer += chunk
+        return buffer.decode(errors='replace').split(CONSOLE_END_MARKER, 1)[0]
+    
+    def _drain_console_output(self):
+        """Consume and log console output left over from connecting or an earlier
+        command, so it cannot leak into the next response.
+        
+        Must be called with _console_lock held.
+        """
+        sock = self._console_sock
+        try:
+            while sock is not None and self._console_selector.select(0):
+                chunk = sock.recv(4096)
+                if not chunk:
+                    logger.debug("Console connection closed by QEMU")
+                    self._close_console_socket()
+                    return
+                for line in chunk.decode(errors='replace').splitlines():
+                    if line.strip():
+                        logger.debug(f"Console: {line.strip()}")
+        except OSError as e:
+            logger.debug(f"Console read failed: {e}")
+            self._close_console_socket()
+    
+    def wait_until_next_check(self, timeout: float):
+        """Sleep up to `timeout` seconds between checks, returning early on stop()"""
+        deadline = time.monotonic() + timeout
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._wakeup_selector.select(remaining):
+                return
+            try:
+                while self._wakeup_recv.recv(64):
+                    pass
+            except BlockingIOError:
+                pass
+    
     def send_console_command(self, command: str, timeout: int = 10) -> Optional[str]:
         """Send command to QEMU console and get response"""
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(timeout)
-                sock.connect(('localhost', self.qemu_console_port))
-                
-                # Send command
-                sock.send(f"{command}\n".encode())
-                
-                # Receive response
-                response = sock.recv(4096).decode()
-                return response
+        # Quoting the marker keeps the console's echo of the command line from
+        # matching it; only the shell's output of the echo does
+        payload = f"{command}; echo {CONSOLE_END_MARKER_QUOTED}\n".encode()
+        
+        with self._console_lock:
+            for attempt in range(2):
+                reused = self._console_sock is not None
+                try:
+                    # Don't let stale unsolicited output leak into this response
+                    self._drain_console_output()
+                    sock = self._get_console_socket(timeout)
+                    sock.sendall(payload)
+                    output = self._read_until_prompt(sock, timeout)
+                except Exception as e:
+                    self._close_console_socket()
+                    # A stale pooled connection gets one fresh retry
+                    if reused and not attempt and not isinstance(e, socket.timeout):
+                        continue
+                    logger.debug(f"Console command failed: {e}")
+                    return None
                 
-        except Exception as e:
-            logger.debug(f"Console command failed: {e}")
-            return None
+                # Drop the echoed command line, keeping only its output
+                return '\n'.join(
+                    line for line in output.split('\n') if command not in line
+                )
+        return None
     
+    def _get_health_connection(self) -> http.client.HTTPConnection:
+        """Return the keep-alive connection to the health endpoint, opening it if needed"""
+        if self._health_conn is None:
+            self._health_conn = http.client.HTTPConnection(
+                self._health_host, self._health_port, timeout=10
+            )
+        return self._health_conn
+    
+    def _close_health_connection(self):
+        """Drop the health connection so the next probe reconnects"""
+        if self._health_conn is not None:
+            self._health_conn.close()
+            self._health_conn = None
+    
+    def _fetch_health(self) -> Tuple[int, str, bytes]:
+        """GET the health endpoint over the persistent connection"""
+        with self._health_lock:
+            for attempt in range(2):
+                reused = self._health_conn is not None
+                conn = self._get_health_connection()
+                try:
+                    conn.request("GET", self._health_path, headers={'Connection': 'keep-alive'})
+                    response = conn.getresponse()
+                    return response.status, response.reason, response.read()
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    self._close_health_connection()
+                    # The server may have closed an idle keep-alive connection; retry once fresh
+                    if not reused or attempt:
+                        raise
+                except Exception:
+                    self._close_health_connection()
+                    raise
+    
+    @ttl_cache(seconds=5)
     def check_superrelay_health(self) -> Dict[str, Any]:
         """Check SuperRelay health endpoint"""
         try:
-            result = subprocess.run([
-                "curl", "-s", "-f", "--max-time", "10",
-                self.superrelay_health_url
-            ], capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                try:
-                    health_data = json.loads(result.stdout)
-                    self.stats['last_health_check'] = datetime.now()
-                    return {
-                        'status': 'healthy',
-                        'data': health_data
-                    }
-                except json.JSONDecodeError:
-                    return {'status': 'unhealthy', 'error': 'Invalid JSON response'}
-            else:
+            status, reason, body = self._fetch_health()
+        except (socket.timeout, ConnectionError, http.client.HTTPException) as e:
+            with self._stats_lock:
                 self.stats['health_check_failures'] += 1
-                return {
-                    'status': 'unhealthy', 
-                    'error': f'HTTP error: {result.stderr}'
-                }
-                
+            return {'status': 'unhealthy', 'error': f'HTTP error: {e}'}
         except Exception as e:
-            self.stats['health_check_failures'] += 1
+            with self._stats_lock:
+                self.stats['health_check_failures'] += 1
             return {'status': 'error', 'error': str(e)}
+        
+        if status >= 400:
+            with self._stats_lock:
+                self.stats['health_check_failures'] += 1
+            return {
+                'status': 'unhealthy', 
+                'error': f'HTTP error: {status} {reason}'
+            }
+        
+        try:
+            health_data = json_loads(body)
+        except json.JSONDecodeError:
+            return {'status': 'unhealthy', 'error': 'Invalid JSON response'}
+        
+        with self._stats_lock:
+            self.stats['last_health_check'] = datetime.now()
+        return {
+            'status': 'healthy',
+            'data': health_data
+        }
     
     def check_optee_status(self) -> Dict[str, Any]:
         """Check OP-TEE status inside VM"""
@@ -146,8 +428,20 @@ class QemuOpteeMonitor:
         """Get system statistics from inside VM"""
         stats = {}
         
+        # Batch all three commands into one console round-trip
+        response = self.send_console_command(
+            f"free -m; echo {CONSOLE_SPLIT_MARKER_QUOTED}; uptime; echo {CONSOLE_SPLIT_MARKER_QUOTED}; df -h /"
+        )
+        if not response:
+            return stats
+        
+        sections = response.split(CONSOLE_SPLIT_MARKER)
+        if len(sections) != 3:
+            logger.debug(f"Unexpected system stats response: {response!r}")
+            return stats
+        mem_response, load_response, disk_response = sections
+        
         # Memory usage
-        mem_response = self.send_console_command("free -m")
         if mem_response:
             lines = mem_response.split('\n')
             for line in lines:
@@ -161,12 +455,10 @@ class QemuOpteeMonitor:
                         }
         
         # CPU load
-        load_response = self.send_console_command("uptime")
-        if load_response:
+        if load_response.strip():
             stats['load'] = load_response.strip()
         
         # Disk usage
-        disk_response = self.send_console_command("df -h /")
         if disk_response:
             lines = disk_response.split('\n')
             for line in lines:
@@ -182,21 +474,57 @@ class QemuOpteeMonitor:
         
         return stats
     
+    def run_checks(self, checks: Dict[str, Callable[[], Any]],
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run independent checks concurrently and collect their results by name.
+        
+        Checks that raise or do not finish within the timeout yield None.
+        """
+        futures = {name: self._executor.submit(fn) for name, fn in checks.items()}
+        wait(futures.values(), timeout=timeout)
+        
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                logger.warning(f"Check '{name}' timed out after {timeout}s")
+                results[name] = None
+            elif future.exception() is not None:
+                logger.error(f"Check '{name}' failed: {future.exception()}")
+                results[name] = None
+            else:
+                results[name] = future.result()
+        return results
+    
     def generate_status_report(self) -> Dict[str, Any]:
-        """Generate comprehensive status report"""
-        return {
-            'timestamp': datetime.now().isoformat(),
-            'uptime': str(datetime.now() - self.stats['start_time']),
-            'qemu': {
-                'process_running': self.check_qemu_process(),
-                'console_accessible': self.check_console_connection()
-            },
-            'optee': self.check_optee_status(),
-            'trusted_application': self.check_ta_status(),
-            'superrelay': self.check_superrelay_health(),
-            'system_stats': self.get_system_stats(),
-            'monitor_stats': self.stats.copy()
-        }
+        """Generate comprehensive status report
+        
+        The same dict is reused and overwritten by the next call; copy it if it
+        must outlive the current tick.
+        """
+        results = self.run_checks({
+            'qemu_process': self.check_qemu_process,
+            'console': self.check_console_connection,
+            'optee': self.check_optee_status,
+            'ta': self.check_ta_status,
+            'superrelay': self.check_superrelay_health,
+            'system_stats': self.get_system_stats
+        })
+        
+        with self._stats_lock:
+            monitor_stats = self.stats.copy()
+        
+        now = datetime.now()
+        report = self._report
+        report['timestamp'] = now.isoformat()
+        report['uptime'] = str(now - monitor_stats['start_time'])
+        report['qemu']['process_running'] = bool(results['qemu_process'])
+        report['qemu']['console_accessible'] = bool(results['console'])
+        report['optee'] = results['optee'] or {'status': 'error', 'details': 'check failed'}
+        report['trusted_application'] = results['ta'] or {'status': 'missing', 'details': 'check failed'}
+        report['superrelay'] = results['superrelay'] or {'status': 'error', 'error': 'check failed'}
+        report['system_stats'] = results['system_stats'] or {}
+        report['monitor_stats'] = monitor_stats
+        return report
     
     def log_status_report(self, report: Dict[str, Any]):
         """Log status report with appropriate log levels"""
@@ -226,9 +554,14 @@ class QemuOpteeMonitor:
     
     def save_status_report(self, report: Dict[str, Any]):
         """Save detailed status report to file"""
+        path = '/opt/superrelay/logs/status_report.json'
+        tmp_path = path + '.tmp'
         try:
-            with open('/opt/superrelay/logs/status_report.json', 'w') as f:
-                json.dump(report, f, indent=2, default=str)
+            # Serialize once and swap the file in atomically so readers never see a partial report
+            payload = json_dumps(report)
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
         except Exception as e:
             logger.error(f"Failed to save status report: {e}")
     
@@ -239,30 +572,54 @@ class QemuOpteeMonitor:
         logger.info(f"  - QEMU Console Port: {self.qemu_console_port}")
         logger.info(f"  - SuperRelay Health URL: {self.superrelay_health_url}")
         
-        check_interval = 30  # seconds
-        detailed_report_interval = 300  # 5 minutes
+        # Adaptive check interval: back off exponentially while everything stays
+        # healthy and snap back to the base interval on any failure. This trades
+        # slower failure detection in steady state (up to max_check_interval) for
+        # far fewer probes; failures are then re-checked every base interval.
+        base_check_interval = 30  # seconds
+        max_check_interval = 300  # 5 minutes
+        check_interval = base_check_interval
+        detailed_report_interval = 300  # 5 minutes, independent of check_interval
         last_detailed_report = 0
         
         while self.running:
             try:
                 current_time = time.time()
                 
-                # Quick health checks every 30 seconds
-                qemu_running = self.check_qemu_process()
-                console_available = self.check_console_connection()
+                # Quick health checks every check_interval, run concurrently
+                results = self.run_checks({
+                    'qemu_process': self.check_qemu_process,
+                    'console': self.check_console_connection,
+                    'superrelay': self.check_superrelay_health
+                }, timeout=base_check_interval)
+                qemu_running = results['qemu_process']
+                console_available = results['console']
                 
-                if not qemu_running:
+                # None means the check itself failed or timed out, not that QEMU is down
+                if qemu_running is False:
                     logger.error("QEMU process not running!")
                     break
+                if qemu_running is None:
+                    logger.warning("QEMU process check did not complete, retrying next tick")
                 
                 if not console_available:
                     logger.warning("QEMU console not accessible")
                 
                 # SuperRelay health check
-                sr_health = self.check_superrelay_health()
+                sr_health = results['superrelay'] or {'status': 'error', 'error': 'check timed out'}
                 if sr_health['status'] != 'healthy':
                     logger.warning(f"SuperRelay health issue: {sr_health}")
                 
+                if qemu_running and console_available and sr_health['status'] == 'healthy':
+                    self._healthy_streak += 1
+                    check_interval = min(check_interval * 2, max_check_interval)
+                else:
+                    if self._healthy_streak:
+                        logger.info(f"Health degraded after {self._healthy_streak} healthy checks, "
+                                    f"resetting check interval to {base_check_interval}s")
+                    self._healthy_streak = 0
+                    check_interval = base_check_interval
+                
                 # Detailed report every 5 minutes
                 if current_time - last_detailed_report > detailed_report_interval:
                     logger.info("📊 Generating detailed status report...")
@@ -276,15 +633,27 @@ class QemuOpteeMonitor:
                     if uptime_hours > 1 and int(uptime_hours) % 6 == 0:  # Every 6 hours
                         logger.info(f"🕐 System uptime: {uptime_hours:.1f} hours")
                 
-                time.sleep(check_interval)
+                # Commands within a tick share one connection; release it before idling
+                self.release_console_socket()
+                self.wait_until_next_check(check_interval)
                 
             except KeyboardInterrupt:
                 logger.info("Monitor interrupted by user")
                 break
             except Exception as e:
                 logger.error(f"Monitor error: {e}")
+                self.release_console_socket()
                 time.sleep(5)  # Brief pause before retrying
         
+        self._executor.shutdown(wait=False)
+        with self._health_lock:
+            self._close_health_connection()
+        with self._console_lock:
+            self._close_console_socket()
+        self._console_selector.close()
+        self._wakeup_selector.close()
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
         logger.info("🔍 QEMU OP-TEE Monitor shutdown complete")
 
 def main():
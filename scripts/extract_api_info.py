@@ -6,13 +6,167 @@ SuperRelay API信息提取器
 
 import os
 import re
+import bisect
 import json
+import mmap
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
 import sys
 
+try:
+    import orjson  # 可选依赖：更快的JSON序列化
+except ImportError:
+    orjson = None
+
+try:
+    # 可选依赖：tree-sitter语法树解析，正确处理嵌套泛型；未安装时退回正则解析
+    import tree_sitter_rust
+    from tree_sitter import Language, Node, Parser
+    _RUST_LANGUAGE = Language(tree_sitter_rust.language())
+except (ImportError, TypeError, ValueError):
+    # 未安装，或 tree-sitter < 0.22（Language() 签名不兼容）
+    _RUST_LANGUAGE = None
+
+# 预编译的正则表达式，避免每个文件重复查找/编译
+_VERSION_RE = re.compile(r'version\s*=\s*"([^"]+)"')
+# 查找 #[method(name = "...")] 注解（bytes模式，直接匹配mmap映射的源文件）
+_METHOD_RE_BYTES = re.compile(
+    rb'#\[method\(name\s*=\s*"([^"]+)"\)\]\s*(?:async\s+)?fn\s+(\w+)\s*\([^)]*\)\s*(?:->\s*([^{;]+))?',
+    re.MULTILINE
+)
+_PARAM_RE = re.compile(r'(\w+):\s*([^,)]+)')
+# 需要提取的结构体所派生的trait名；正则、tree-sitter两种解析方式和预过滤都以此为准
+_STRUCT_DERIVE = 'Serialize'
+# 查找struct定义（bytes模式，直接匹配mmap映射的源文件）
+_STRUCT_RE_BYTES = re.compile(
+    rb'#\[derive\([^\]]*' + re.escape(_STRUCT_DERIVE.encode()) + rb'[^\]]*\)\]\s*pub struct (\w+)\s*\{([^}]+)\}',
+    re.DOTALL
+)
+_FIELD_RE = re.compile(r'pub\s+(\w+):\s*([^,\n]+)')
+_NEWLINE_RE_BYTES = re.compile(rb'\n')
+
+# 构建产物、版本库和第三方依赖目录，不属于项目源码，扫描时整体跳过
+_SKIP_DIRS = {'target', '.git', 'node_modules', 'vendor', '.cargo'}
+# 需要分析的文件至少包含其中一个标记（与扫描时的子串预过滤一致）
+_SOURCE_MARKERS = ('#[method', _STRUCT_DERIVE)
+
+# 基本类型映射（模块加载时构建一次；返回的schema为共享对象，调用方不得修改）
+_RUST_TYPE_SCHEMAS = {
+    'String': {'type': 'string'},
+    'str': {'type': 'string'},
+    'u64': {'type': 'integer', 'format': 'int64'},
+    'u32': {'type': 'integer', 'format': 'int32'},
+    'i64': {'type': 'integer', 'format': 'int64'},
+    'i32': {'type': 'integer', 'format': 'int32'},
+    'bool': {'type': 'boolean'},
+    'f64': {'type': 'number', 'format': 'double'},
+    'f32': {'type': 'number', 'format': 'float'},
+    'Bytes': {'type': 'string', 'description': 'Hex-encoded bytes'},
+    'Address': {'type': 'string', 'description': 'Ethereum address'},
+    'B256': {'type': 'string', 'description': 'Hash value'},
+    'U256': {'type': 'string', 'description': 'Large integer as string'},
+}
+
+# 按方法前缀分组 - 改进的分类系统
+_METHOD_GROUPS = {
+    # Paymaster 核心业务 API
+    'sponsorUserOperation': 'Paymaster API',
+    'pm_': 'Paymaster API',
+    
+    # 标准 ERC-4337 API
+    'sendUserOperation': 'ERC-4337 API',
+    'estimateUserOperationGas': 'ERC-4337 API',
+    'getUserOperationByHash': 'ERC-4337 API',
+    'getUserOperationReceipt': 'ERC-4337 API',
+    'supportedEntryPoints': 'ERC-4337 API',
+    'chainId': 'ERC-4337 API',
+    'eth_': 'ERC-4337 API',
+    
+    # Rundler 扩展 API
+    'maxPriorityFeePerGas': 'Rundler API',
+    'dropLocalUserOperation': 'Rundler API',
+    'getMinedUserOperation': 'Rundler API',
+    'getUserOperationStatus': 'Rundler API',
+    'getPendingUserOperationBySenderNonce': 'Rundler API',
+    'rundler_': 'Rundler API',
+    
+    # Debug 和测试 API
+    'bundler_': 'Debug API',
+    'debug_': 'Debug API',
+    
+    # 管理和配置 API
+    'clearState': 'Admin API',
+    'setTracking': 'Admin API',
+    'admin_': 'Admin API',
+    
+    # 健康检查和监控 API
+    'health': 'Monitoring API',
+    'metrics': 'Monitoring API',
+    'balance': 'Monitoring API'
+}
+
+# 按首字符索引前缀（保持原有顺序），分类时只需检查同首字符的候选前缀
+_GROUP_PREFIXES_BY_FIRST_CHAR: Dict[str, List[Tuple[str, str]]] = {}
+for _prefix, _group_name in _METHOD_GROUPS.items():
+    _GROUP_PREFIXES_BY_FIRST_CHAR.setdefault(_prefix[0], []).append((_prefix, _group_name))
+
+def _api_group(rpc_method: str) -> str:
+    """确定API组 - 优先精确匹配，然后前缀匹配"""
+    # 1. 先尝试精确匹配
+    if rpc_method in _METHOD_GROUPS:
+        return _METHOD_GROUPS[rpc_method]
+    
+    # 2. 然后只在首字符相同的前缀中尝试前缀匹配
+    for prefix, group_name in _GROUP_PREFIXES_BY_FIRST_CHAR.get(rpc_method[:1], ()):
+        if rpc_method.startswith(prefix):
+            return group_name
+    
+    return 'Other'
+
+# 源文件内容: 只读mmap映射，或空文件时的 b''
+SourceBuffer = Union[bytes, mmap.mmap]
+
+def _decode(data: bytes) -> str:
+    """只解码匹配到的片段，而不是整个文件"""
+    return data.decode('utf-8', 'replace')
+
+def _newline_offsets(content: SourceBuffer) -> List[int]:
+    """一次性收集文件中所有换行符的偏移量（有序），供二分查找行号"""
+    return [match.start() for match in _NEWLINE_RE_BYTES.finditer(content)]
+
+_rust_parser = None
+
+def _parse_rust_source(content: SourceBuffer) -> 'Node':
+    """用tree-sitter解析源文件，返回语法树根节点（每个进程惰性创建一个解析器）"""
+    global _rust_parser
+    if _rust_parser is None:
+        _rust_parser = Parser(_RUST_LANGUAGE)
+    # 通过回调分块读取mmap，避免复制整个文件
+    return _rust_parser.parse(lambda offset, _point: content[offset:offset + 65536]).root_node
+
+def _node_bytes(node: 'Node', content: SourceBuffer) -> bytes:
+    """从源文件缓冲区切出节点对应的字节（回调方式解析时 tree-sitter < 0.25 的 Node.text 为None）"""
+    return content[node.start_byte:node.end_byte]
+
+def _node_text(node: 'Node', content: SourceBuffer) -> str:
+    return _decode(_node_bytes(node, content))
+
+@contextmanager
+def _open_source(file_path: Path) -> Iterator[SourceBuffer]:
+    """以只读mmap方式打开源文件，正则直接在映射内存上匹配，无需复制和解码整个文件"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''  # 空文件无法mmap
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
 @dataclass
 class ApiEndpoint:
     method_name: str
@@ -41,45 +195,94 @@ class RustCodeAnalyzer:
         if cargo_path.exists():
             with open(cargo_path, 'r') as f:
                 content = f.read()
-                match = re.search(r'version\s*=\s*"([^"]+)"', content)
+                match = _VERSION_RE.search(content)
                 if match:
                     return match.group(1)
         return "0.1.0"
     
-    def find_rpc_methods(self) -> None:
-        """扫描所有Rust源文件，提取RPC方法定义"""
-        rust_files = list(self.project_root.rglob("*.rs"))
+    def find_rust_files(self) -> List[Path]:
+        """查找项目中的Rust源文件，跳过 target/、.git/ 等非源码目录
+        
+        优先用ripgrep一次性筛出包含RPC方法/数据结构标记的文件，未安装时遍历目录。
+        结果按路径排序，保证两种方式下输出顺序一致。
+        """
+        rust_files = self._find_rust_files_with_ripgrep()
+        if rust_files is None:
+            rust_files = []
+            for dirpath, dirnames, filenames in os.walk(self.project_root):
+                dirnames[:] = [d for d in dirnames if d not in _SKIP_DIRS]
+                rust_files.extend(Path(dirpath) / name for name in filenames if name.endswith('.rs'))
+        return sorted(rust_files)
+    
+    def _find_rust_files_with_ripgrep(self) -> Optional[List[Path]]:
+        """用ripgrep列出包含标记的Rust文件；ripgrep不可用或出错时返回None"""
+        command = ['rg', '--files-with-matches', '--no-messages', '--no-ignore', '--hidden',
+                   '--type', 'rust', '--fixed-strings']
+        for marker in _SOURCE_MARKERS:
+            command += ['-e', marker]
+        for skip_dir in sorted(_SKIP_DIRS):
+            command += ['--glob', f'!{skip_dir}/']
+        
+        try:
+            result = subprocess.run(command + ['.'], cwd=self.project_root,
+                                    capture_output=True, text=True)
+        except OSError:
+            return None
+        # 退出码: 0 有匹配, 1 无匹配, 2 出错
+        if result.returncode not in (0, 1):
+            return None
+        return [self.project_root / line for line in result.stdout.splitlines() if line]
+    
+    def scan_all(self) -> None:
+        """单次遍历所有Rust源文件，每个文件只读取一次，同时提取RPC方法和数据结构"""
+        rust_files = self.find_rust_files()
         print(f"📂 扫描到 {len(rust_files)} 个Rust文件")
         
-        for file_path in rust_files:
-            try:
-                self.analyze_rust_file(file_path)
-            except Exception as e:
-                print(f"⚠️  分析文件失败 {file_path}: {e}")
+        scan = partial(_scan_rust_file, str(self.project_root))
+        results = _map_files(scan, rust_files)
+        
+        for file_path, endpoints, _, error in results:
+            if error:
+                print(f"⚠️  分析文件失败 {file_path}: {error}")
+                continue
+            for rpc_name, endpoint in endpoints.items():
+                self.rpc_methods[rpc_name] = endpoint
+                print(f"✅ 发现API方法: {rpc_name} -> {endpoint.method_name} ({file_path.name}:{endpoint.line_number})")
+        
+        # 同名结构体以路径顺序中的第一个定义为准，后续定义不覆盖，只提示冲突
+        for _, _, data_types, _ in results:
+            for struct_name, schema in data_types.items():
+                existing = self.data_types.setdefault(struct_name, schema)
+                if existing is not schema:
+                    print(f"⚠️  数据结构重名: {struct_name} ({schema['file']})，保留 {existing['file']} 中的定义")
+                    continue
+                print(f"📋 发现数据结构: {struct_name} (字段: {len(schema['properties'])})")
     
-    def analyze_rust_file(self, file_path: Path) -> None:
+    def analyze_rust_file(self, file_path: Path, content: Optional[SourceBuffer] = None) -> Dict[str, ApiEndpoint]:
         """分析单个Rust文件，提取API定义"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if content is None:
+            with _open_source(file_path) as source:
+                return self.analyze_rust_file(file_path, source)
         
-        # 查找 #[method(name = "...")] 注解
-        method_pattern = r'#\[method\(name\s*=\s*"([^"]+)"\)\]\s*(?:async\s+)?fn\s+(\w+)\s*\([^)]*\)\s*(?:->\s*([^{;]+))?'
-        
-        for match in re.finditer(method_pattern, content, re.MULTILINE):
-            rpc_name = match.group(1)
-            method_name = match.group(2)
-            return_type = match.group(3).strip() if match.group(3) else "void"
+        endpoints = {}
+        newlines = None
+        for match in _METHOD_RE_BYTES.finditer(content):
+            rpc_name = _decode(match.group(1))
+            method_name = _decode(match.group(2))
+            return_type = _decode(match.group(3)).strip() if match.group(3) else "void"
             
-            # 获取行号
-            line_number = content[:match.start()].count('\n') + 1
+            # 获取行号 - 换行符偏移每个文件只计算一次，之后二分查找
+            if newlines is None:
+                newlines = _newline_offsets(content)
+            line_number = bisect.bisect_left(newlines, match.start()) + 1
             
             # 提取方法文档注释
-            description = self.extract_method_doc(content, match.start())
+            description = self.extract_method_doc(content, match.start(), newlines, line_number)
             
             # 提取参数信息
-            parameters = self.extract_method_parameters(content, match.group(0))
+            parameters = self.extract_method_parameters(content, _decode(match.group(0)))
             
-            endpoint = ApiEndpoint(
+            endpoints[rpc_name] = ApiEndpoint(
                 method_name=method_name,
                 rpc_method=rpc_name,
                 description=description,
@@ -88,18 +291,21 @@ class RustCodeAnalyzer:
                 file_path=str(file_path.relative_to(self.project_root)),
                 line_number=line_number
             )
-            
-            self.rpc_methods[rpc_name] = endpoint
-            print(f"✅ 发现API方法: {rpc_name} -> {method_name} ({file_path.name}:{line_number})")
+        
+        return endpoints
     
-    def extract_method_doc(self, content: str, method_start: int) -> str:
+    def extract_method_doc(self, content: SourceBuffer, method_start: int,
+                           newlines: List[int], line_number: int) -> str:
         """提取方法的文档注释"""
-        lines = content[:method_start].split('\n')
+        # 借助已计算的换行符偏移，只切出方法定义前的10行，而不是重新切分整个文件前缀
+        line_index = line_number - 1
+        window_start = newlines[line_index - 10] + 1 if line_index >= 10 else 0
+        lines = content[window_start:method_start].split(b'\n')
         doc_lines = []
         
         # 从方法定义位置向上查找文档注释
-        for line in reversed(lines[-10:]):  # 只查找前10行
-            line = line.strip()
+        for line in reversed(lines):  # 只查找前10行
+            line = _decode(line).strip()
             if line.startswith('///'):
                 doc_lines.append(line[3:].strip())
             elif line.startswith('//'):
@@ -109,13 +315,12 @@ class RustCodeAnalyzer:
         
         return ' '.join(reversed(doc_lines)) if doc_lines else "No description available"
     
-    def extract_method_parameters(self, content: str, method_def: str) -> List[Dict]:
+    def extract_method_parameters(self, content: SourceBuffer, method_def: str) -> List[Dict]:
         """提取方法参数信息"""
         # 简化的参数解析
-        param_pattern = r'(\w+):\s*([^,)]+)'
         parameters = []
         
-        for match in re.finditer(param_pattern, method_def):
+        for match in _PARAM_RE.finditer(method_def):
             param_name = match.group(1)
             param_type = match.group(2).strip()
             
@@ -131,8 +336,10 @@ class RustCodeAnalyzer:
         
         return parameters
     
-    def rust_type_to_json_schema(self, rust_type: str) -> Dict:
-        """将Rust类型转换为JSON Schema类型"""
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def rust_type_to_json_schema(rust_type: str) -> Dict:
+        """将Rust类型转换为JSON Schema类型（按类型字符串缓存，返回共享对象，调用方不得修改）"""
         rust_type = rust_type.strip()
         
         # 移除泛型包装
@@ -141,34 +348,17 @@ class RustCodeAnalyzer:
         if rust_type.startswith('Option<'):
             rust_type = rust_type[7:-1]
         
-        # 基本类型映射
-        type_mapping = {
-            'String': {'type': 'string'},
-            'str': {'type': 'string'},
-            'u64': {'type': 'integer', 'format': 'int64'},
-            'u32': {'type': 'integer', 'format': 'int32'},
-            'i64': {'type': 'integer', 'format': 'int64'},
-            'i32': {'type': 'integer', 'format': 'int32'},
-            'bool': {'type': 'boolean'},
-            'f64': {'type': 'number', 'format': 'double'},
-            'f32': {'type': 'number', 'format': 'float'},
-            'Bytes': {'type': 'string', 'description': 'Hex-encoded bytes'},
-            'Address': {'type': 'string', 'description': 'Ethereum address'},
-            'B256': {'type': 'string', 'description': 'Hash value'},
-            'U256': {'type': 'string', 'description': 'Large integer as string'},
-        }
-        
         # 数组类型
         if rust_type.startswith('Vec<'):
             item_type = rust_type[4:-1]
             return {
                 'type': 'array',
-                'items': self.rust_type_to_json_schema(item_type)
+                'items': RustCodeAnalyzer.rust_type_to_json_schema(item_type)
             }
         
         # 检查是否是已知类型
-        if rust_type in type_mapping:
-            return type_mapping[rust_type]
+        if rust_type in _RUST_TYPE_SCHEMAS:
+            return _RUST_TYPE_SCHEMAS[rust_type]
         
         # 自定义类型，生成引用
         if rust_type.startswith('Rpc'):
@@ -177,45 +367,133 @@ class RustCodeAnalyzer:
         # 默认为object类型
         return {'type': 'object', 'description': f'Custom type: {rust_type}'}
     
-    def find_data_structures(self) -> None:
-        """查找数据结构定义（struct、enum等）"""
-        rust_files = list(self.project_root.rglob("*.rs"))
-        
-        for file_path in rust_files:
-            try:
-                self.extract_data_structures(file_path)
-            except Exception as e:
-                print(f"⚠️  提取数据结构失败 {file_path}: {e}")
-    
-    def extract_data_structures(self, file_path: Path) -> None:
+    def extract_data_structures(self, file_path: Path, content: Optional[SourceBuffer] = None) -> Dict[str, Dict]:
         """从Rust文件中提取struct和enum定义"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if content is None:
+            with _open_source(file_path) as source:
+                return self.extract_data_structures(file_path, source)
         
-        # 查找struct定义
-        struct_pattern = r'#\[derive\([^\]]*Serialize[^\]]*\)\]\s*pub struct (\w+)\s*\{([^}]+)\}'
-        
-        for match in re.finditer(struct_pattern, content, re.DOTALL):
-            struct_name = match.group(1)
-            struct_body = match.group(2)
+        data_types = {}
+        for match in _STRUCT_RE_BYTES.finditer(content):
+            struct_name = _decode(match.group(1))
+            struct_body = _decode(match.group(2))
             
             # 解析字段
             fields = self.parse_struct_fields(struct_body)
             
-            self.data_types[struct_name] = {
+            data_types[struct_name] = {
                 'type': 'object',
                 'properties': fields,
                 'file': str(file_path.relative_to(self.project_root))
             }
+        
+        return data_types
+    
+    def analyze_syntax_tree(self, file_path: Path, root: 'Node', content: SourceBuffer) -> Tuple[Dict[str, ApiEndpoint], Dict[str, Dict]]:
+        """基于tree-sitter语法树提取API方法和数据结构"""
+        rel_path = str(file_path.relative_to(self.project_root))
+        found = []  # (起始偏移, 类型, 名称, 定义)，最后按源码顺序合并，与正则扫描结果顺序一致
+        
+        # 只遍历条目容器（源文件及 mod/trait/impl 的声明列表），不进入函数体和表达式
+        stack = [root]
+        while stack:
+            children = stack.pop().named_children
             
-            print(f"📋 发现数据结构: {struct_name} (字段: {len(fields)})")
+            # 在同一层级中收集每个条目前面的文档注释和属性
+            doc_lines: List[str] = []
+            attributes: List['Node'] = []
+            for child in children:
+                if child.type == 'attribute_item':
+                    attributes.append(child)
+                    continue
+                if child.type == 'line_comment':
+                    doc = child.child_by_field_name('doc')
+                    if doc is not None and child.child_by_field_name('outer') is not None:
+                        doc_lines.append(_node_text(doc, content).strip())
+                    continue  # 跳过普通注释
+                
+                if child.type in ('function_item', 'function_signature_item'):
+                    rpc_attr = next((a for a in attributes if _rpc_method_name(a, content)), None)
+                    if rpc_attr is not None:
+                        endpoint = self._endpoint_from_node(child, rpc_attr, doc_lines, rel_path, content)
+                        found.append((rpc_attr.start_byte, 'method', endpoint.rpc_method, endpoint))
+                elif child.type == 'struct_item' and any(_derives_struct_trait(a, content) for a in attributes):
+                    schema = self._schema_from_struct_node(child, rel_path, content)
+                    if schema is not None:
+                        found.append((child.start_byte, 'struct', _node_text(child.child_by_field_name('name'), content), schema))
+                
+                elif child.type in _ITEM_CONTAINER_TYPES:
+                    body = child.child_by_field_name('body')
+                    if body is not None and body.type == 'declaration_list':
+                        stack.append(body)
+                
+                doc_lines, attributes = [], []
+        
+        endpoints, data_types = {}, {}
+        for _, kind, name, value in sorted(found, key=lambda item: item[0]):
+            if kind == 'method':
+                endpoints[name] = value
+            else:
+                data_types[name] = value
+        return endpoints, data_types
+    
+    def _endpoint_from_node(self, fn_node: 'Node', rpc_attr: 'Node', doc_lines: List[str],
+                            rel_path: str, content: SourceBuffer) -> ApiEndpoint:
+        """由函数节点及其 #[method(...)] 属性构造ApiEndpoint"""
+        parameters = []
+        for param in fn_node.child_by_field_name('parameters').named_children:
+            if param.type != 'parameter':
+                continue  # 跳过self参数
+            # `mut name: T` 只保留变量名
+            param_name = _node_text(param.child_by_field_name('pattern'), content).split()[-1]
+            param_type = _node_text(param.child_by_field_name('type'), content).strip()
+            parameters.append({
+                'name': param_name,
+                'type': self.rust_type_to_json_schema(param_type),
+                'required': not param_type.startswith('Option<')
+            })
+        
+        return_type = fn_node.child_by_field_name('return_type')
+        return ApiEndpoint(
+            method_name=_node_text(fn_node.child_by_field_name('name'), content),
+            rpc_method=_rpc_method_name(rpc_attr, content),
+            description=' '.join(doc_lines) if doc_lines else "No description available",
+            parameters=parameters,
+            return_type=_node_text(return_type, content).strip() if return_type is not None else "void",
+            file_path=rel_path,
+            line_number=rpc_attr.start_point[0] + 1
+        )
+    
+    def _schema_from_struct_node(self, struct_node: 'Node', rel_path: str, content: SourceBuffer) -> Optional[Dict]:
+        """由带 _STRUCT_DERIVE 派生的 pub struct 节点构造schema，只收集pub字段"""
+        visibility = struct_node.named_children[0] if struct_node.named_children else None
+        body = struct_node.child_by_field_name('body')
+        if visibility is None or visibility.type != 'visibility_modifier' or _node_bytes(visibility, content) != b'pub':
+            return None
+        if body is None or body.type != 'field_declaration_list':
+            return None  # 元组结构体或单元结构体
+        
+        fields = {}
+        for field in body.named_children:
+            if field.type != 'field_declaration':
+                continue
+            field_visibility = field.named_children[0]
+            if field_visibility.type != 'visibility_modifier' or _node_bytes(field_visibility, content) != b'pub':
+                continue
+            field_name = _node_text(field.child_by_field_name('name'), content)
+            fields[field_name] = self.rust_type_to_json_schema(_node_text(field.child_by_field_name('type'), content))
+        
+        return {
+            'type': 'object',
+            'properties': fields,
+            'file': rel_path
+        }
     
     def parse_struct_fields(self, struct_body: str) -> Dict:
         """解析struct字段"""
         fields = {}
-        field_pattern = r'pub\s+(\w+):\s*([^,\n]+)'
         
-        for match in re.finditer(field_pattern, struct_body):
+        for match in _FIELD_RE.finditer(struct_body):
             field_name = match.group(1)
             field_type = match.group(2).strip().rstrip(',')
             fields[field_name] = self.rust_type_to_json_schema(field_type)
@@ -233,7 +511,7 @@ class RustCodeAnalyzer:
                 "version": version,
                 "description": f"自动从代码生成的API文档 (发现 {len(self.rpc_methods)} 个API方法)",
                 "x-generated": {
-                    "timestamp": subprocess.check_output(['date', '-u', '+%Y-%m-%dT%H:%M:%SZ']).decode().strip(),
+                    "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
                     "source": "自动代码分析",
                     "methods_found": len(self.rpc_methods),
                     "data_types_found": len(self.data_types)
@@ -277,58 +555,9 @@ class RustCodeAnalyzer:
             }
         }
         
-        # 按方法前缀分组 - 改进的分类系统
-        method_groups = {
-            # Paymaster 核心业务 API
-            'sponsorUserOperation': 'Paymaster API',
-            'pm_': 'Paymaster API',
-            
-            # 标准 ERC-4337 API
-            'sendUserOperation': 'ERC-4337 API',
-            'estimateUserOperationGas': 'ERC-4337 API',
-            'getUserOperationByHash': 'ERC-4337 API',
-            'getUserOperationReceipt': 'ERC-4337 API',
-            'supportedEntryPoints': 'ERC-4337 API',
-            'chainId': 'ERC-4337 API',
-            'eth_': 'ERC-4337 API',
-            
-            # Rundler 扩展 API
-            'maxPriorityFeePerGas': 'Rundler API',
-            'dropLocalUserOperation': 'Rundler API', 
-            'getMinedUserOperation': 'Rundler API',
-            'getUserOperationStatus': 'Rundler API',
-            'getPendingUserOperationBySenderNonce': 'Rundler API',
-            'rundler_': 'Rundler API',
-            
-            # Debug 和测试 API
-            'bundler_': 'Debug API',
-            'debug_': 'Debug API',
-            
-            # 管理和配置 API
-            'clearState': 'Admin API',
-            'setTracking': 'Admin API',
-            'admin_': 'Admin API',
-            
-            # 健康检查和监控 API
-            'health': 'Monitoring API',
-            'metrics': 'Monitoring API',
-            'balance': 'Monitoring API'
-        }
-        
         # 生成路径
         for rpc_method, endpoint in self.rpc_methods.items():
-            # 确定API组 - 优先精确匹配，然后前缀匹配
-            group = 'Other'
-            
-            # 1. 先尝试精确匹配
-            if rpc_method in method_groups:
-                group = method_groups[rpc_method]
-            else:
-                # 2. 然后尝试前缀匹配
-                for prefix, group_name in method_groups.items():
-                    if rpc_method.startswith(prefix):
-                        group = group_name
-                        break
+            group = _api_group(rpc_method)
             
             # 生成路径信息
             path_info = {
@@ -380,6 +609,86 @@ class RustCodeAnalyzer:
         
         return openapi_spec
 
+# 可能包含RPC方法或结构体定义的条目容器
+_ITEM_CONTAINER_TYPES = ('mod_item', 'trait_item', 'impl_item')
+
+def _rpc_method_name(attribute_item: 'Node', content: SourceBuffer) -> Optional[str]:
+    """从 #[method(name = "...")] 属性中取出RPC方法名，其他属性返回None"""
+    attribute = attribute_item.named_children[0] if attribute_item.named_children else None
+    if attribute is None or _node_bytes(attribute.named_children[0], content) != b'method':
+        return None
+    arguments = attribute.child_by_field_name('arguments')
+    if arguments is None:
+        return None
+    tokens = arguments.children
+    for i in range(len(tokens) - 2):
+        if (_node_bytes(tokens[i], content) == b'name' and _node_bytes(tokens[i + 1], content) == b'='
+                and tokens[i + 2].type == 'string_literal'):
+            return _decode(_node_bytes(tokens[i + 2], content)[1:-1])
+    return None
+
+def _derives_struct_trait(attribute_item: 'Node', content: SourceBuffer) -> bool:
+    """判断属性是否为包含 _STRUCT_DERIVE 的 #[derive(...)]"""
+    attribute = attribute_item.named_children[0] if attribute_item.named_children else None
+    if attribute is None or _node_bytes(attribute.named_children[0], content) != b'derive':
+        return False
+    arguments = attribute.child_by_field_name('arguments')
+    return arguments is not None and _STRUCT_DERIVE.encode() in _node_bytes(arguments, content)
+
+# 单个文件的分析结果: (文件路径, API方法, 数据结构, 错误信息)
+ScanResult = Tuple[Path, Dict[str, ApiEndpoint], Dict[str, Dict], Optional[str]]
+
+def _scan_rust_file(project_root: str, file_path: Path) -> ScanResult:
+    """进程池任务: 读取单个文件一次，提取API方法和数据结构，异常作为结果返回给主进程"""
+    try:
+        analyzer = RustCodeAnalyzer(project_root)
+        with _open_source(file_path) as content:
+            # 子串预过滤：大多数文件既没有RPC方法也没有可序列化结构体，直接跳过解析和正则
+            has_method = content.find(b'#[method') != -1
+            has_struct = content.find(_STRUCT_DERIVE.encode()) != -1 and content.find(b'pub struct') != -1
+            if not (has_method or has_struct):
+                return file_path, {}, {}, None
+            
+            if _RUST_LANGUAGE is not None:
+                endpoints, data_types = analyzer.analyze_syntax_tree(file_path, _parse_rust_source(content), content)
+                return file_path, endpoints, data_types, None
+            return (
+                file_path,
+                analyzer.analyze_rust_file(file_path, content) if has_method else {},
+                analyzer.extract_data_structures(file_path, content) if has_struct else {},
+                None
+            )
+    except Exception as e:
+        return file_path, {}, {}, str(e)
+
+# 文件数少于此值时串行分析：进程池启动开销高于扫描本身
+_PARALLEL_MIN_FILES = 500
+
+def _map_files(fn: Callable[[Path], ScanResult], files: List[Path]) -> List[ScanResult]:
+    """用进程池并行分析文件（正则扫描是CPU密集型），结果保持文件顺序
+    
+    返回列表而不是迭代器：scan_all 会遍历结果两次。
+    """
+    if len(files) < _PARALLEL_MIN_FILES or (os.cpu_count() or 1) == 1:
+        return [fn(file_path) for file_path in files]
+    try:
+        with ProcessPoolExecutor() as executor:
+            return list(executor.map(fn, files, chunksize=16))
+    except (OSError, NotImplementedError):
+        # 无法创建子进程的环境（如缺少 /dev/shm）退回单进程
+        return [fn(file_path) for file_path in files]
+
+def write_json_atomic(output_file: Path, data: Dict) -> None:
+    """一次性序列化后整体写入临时文件，再原子替换目标文件，避免大量小write和半写入文件"""
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_file, output_file)
+
 def main():
     if len(sys.argv) > 1:
         project_root = sys.argv[1]
@@ -389,24 +698,19 @@ def main():
     print(f"🔍 分析项目: {project_root}")
     analyzer = RustCodeAnalyzer(project_root)
     
-    # 步骤1: 提取API方法
-    print("\n📡 提取API方法...")
-    analyzer.find_rpc_methods()
-    
-    # 步骤2: 提取数据结构
-    print("\n📋 提取数据结构...")
-    analyzer.find_data_structures()
+    # 步骤1: 单次扫描提取API方法和数据结构
+    print("\n📡 提取API方法和数据结构...")
+    analyzer.scan_all()
     
-    # 步骤3: 生成OpenAPI规范
+    # 步骤2: 生成OpenAPI规范
     print("\n🛠️  生成OpenAPI规范...")
     openapi_spec = analyzer.generate_openapi_spec()
     
-    # 步骤4: 保存文件
+    # 步骤3: 保存文件
     output_file = Path(project_root) / "web-ui" / "swagger-ui" / "openapi.json"
     output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(openapi_spec, f, indent=2, ensure_ascii=False)
+    write_json_atomic(output_file, openapi_spec)
     
     print(f"\n✅ OpenAPI规范已生成: {output_file}")
     print(f"📊 统计信息:")